@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
-import sys, json, requests
+import sys, asyncio, httpx
 
-TERM = sys.argv[1] if len(sys.argv) > 1 else "STXBP1"
+TERMS = sys.argv[1:] or ["STXBP1"]
 
 HEADERS = {
     "Accept": "application/json",
     "User-Agent": "local-ctgov-test/1.0 (+you@example.com)"
 }
 
-def try_v2(term):
+async def try_v2(client, term):
     url = "https://clinicaltrials.gov/api/v2/studies"
     params = {
         "query.term": term,
@@ -16,10 +16,10 @@ def try_v2(term):
         "countTotal": "true",
         "format": "json"
     }
-    r = requests.get(url, params=params, headers=HEADERS, timeout=30)
+    r = await client.get(url, params=params, timeout=30)
     return r.status_code, r.text, (r.json() if r.headers.get("content-type","").startswith("application/json") else None)
 
-def try_v1(term):
+async def try_v1(client, term):
     url = "https://clinicaltrials.gov/api/query/study_fields"
     params = {
         "expr": term,
@@ -28,7 +28,7 @@ def try_v1(term):
         "max_rnk": 20,
         "fmt": "json"
     }
-    r = requests.get(url, params=params, timeout=30)
+    r = await client.get(url, params=params, timeout=30)
     return r.status_code, r.text, (r.json() if r.headers.get("content-type","").startswith("application/json") else None)
 
 def summarize_v2(js):
@@ -50,24 +50,38 @@ def summarize_v1(js):
             ids.append(row["NCTId"][0])
     return n, ids
 
-print(f"Query: {TERM}\n")
+async def main():
+    # One HTTP/2 client for the whole run: the v2/v1 probes for every term
+    # multiplex over a single TLS connection instead of running serially.
+    async with httpx.AsyncClient(http2=True, headers=HEADERS) as client:
+        results = await asyncio.gather(
+            *[try_v2(client, t) for t in TERMS],
+            *[try_v1(client, t) for t in TERMS])
 
-# ---- Try v2 first
-s, raw, js = try_v2(TERM)
-print(f"[v2] HTTP {s}")
-if s == 200 and js:
-    n, ids = summarize_v2(js)
-    print(f"[v2] totalCount={n}, first IDs={ids[:5]}")
-else:
-    print(f"[v2] body (truncated): {raw[:300]}")
+    v2_results = results[:len(TERMS)]
+    v1_results = results[len(TERMS):]
 
-# ---- Then v1 fallback
-s1, raw1, js1 = try_v1(TERM)
-print(f"\n[v1] HTTP {s1}")
-if s1 == 200 and js1:
-    n1, ids1 = summarize_v1(js1)
-    print(f"[v1] NStudiesFound={n1}, first IDs={ids1[:5]}")
-else:
-    print(f"[v1] body (truncated): {raw1[:300]}")
+    for term, (s, raw, js), (s1, raw1, js1) in zip(TERMS, v2_results, v1_results):
+        print(f"Query: {term}\n")
 
-print("\nDone.")
+        # ---- v2
+        print(f"[v2] HTTP {s}")
+        if s == 200 and js:
+            n, ids = summarize_v2(js)
+            print(f"[v2] totalCount={n}, first IDs={ids[:5]}")
+        else:
+            print(f"[v2] body (truncated): {raw[:300]}")
+
+        # ---- v1 fallback
+        print(f"\n[v1] HTTP {s1}")
+        if s1 == 200 and js1:
+            n1, ids1 = summarize_v1(js1)
+            print(f"[v1] NStudiesFound={n1}, first IDs={ids1[:5]}")
+        else:
+            print(f"[v1] body (truncated): {raw1[:300]}")
+        print()
+
+    print("Done.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
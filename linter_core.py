@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+linter_core.py
+
+Shared policy, preclean, and URL-normalization logic for the People JSON
+linters. people_json_linter.py and old_people_json_linter.py import from
+here so regexes compile once and caches are shared.
+"""
+
+import json, re, sys
+from functools import lru_cache
+
+try:
+    import orjson  # optional: C parser/serializer, ~3-10x stdlib
+except ImportError:
+    orjson = None
+
+def json_loads(text):
+    # Accepts str or bytes. orjson.JSONDecodeError subclasses
+    # json.JSONDecodeError, so callers can keep catching the stdlib type.
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def json_dumps_pretty(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+# ---------------- Config / Policy ----------------
+
+try:
+    # optional: the third-party engine validates these linear patterns
+    # faster than stdlib re; drop-in compatible
+    import regex as _fast_re
+    _validator_compile = _fast_re.compile
+except ImportError:
+    _validator_compile = re.compile
+
+URL_REGEX   = _validator_compile(r'^https://[^\s\[\]\(\)]+$')
+EMAIL_REGEX = _validator_compile(r'^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$')
+DATE_REGEX  = _validator_compile(r'^\d{4}-\d{2}-\d{2}$')
+PREPRINT_CONTENT_RE = re.compile(r'https?://(?:www\.)?(?:bio|med)rxiv\.org/content/(10\.1101/[^/\s#?]+)(?:v\d+)?(?:/full\.pdf)?', re.I)
+
+# Interned members let set probes hit the pointer-identity fast path when
+# incoming values are interned on ingest.
+ALLOWED_SECTIONS = frozenset(sys.intern(s) for s in (
+    "Care & Management", "Trials & Translational", "Models & Assays", "Registries & Biobanks"
+))
+ALLOWED_TAGS = frozenset(sys.intern(s) for s in (
+    "peer_reviewed", "preprint", "trial_registry", "case_series",
+    "review_consensus", "dataset_protocol", "news_talk",
+    "preclinical_rescue_in_vitro", "preclinical_rescue_in_vivo", "patent_grant"
+))
+
+CTG_SHOW_PAT = re.compile(r'^https://clinicaltrials\.gov/ct2/show/(NCT[0-9]{8})$', re.I)
+TRACKING_PARAMS_PREFIXES = ('utm_', 'gclid', 'fbclid', 'mc_cid', 'mc_eid', 'igshid', 'ref')
+# One DFA pass over the query key instead of a per-prefix startswith loop
+_TRACK_RE = re.compile('^(?:' + '|'.join(TRACKING_PARAMS_PREFIXES) + ')', re.I)
+
+# Preclean patterns, compiled once (these run on every pasted blob)
+_MD_LINK_RE        = re.compile(r'\[([^\]]+)\]\((https?://[^\s)]+)\)')
+_MD_BRACKET_URL_RE = re.compile(r'\[(https?://[^\]\s)]+)\]')
+_QUOTED_BRACKET_RE = re.compile(r'"\[https://')
+_CTG_TEXT_RE       = re.compile(r'https://clinicaltrials\.gov/ct2/show/(NCT[0-9]{8})')
+_HTTP_QUOTED_RE    = re.compile(r'"http://')
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_URL_TOKEN_RE      = re.compile(r'https://[^\s\[\]\(\)"]+')
+
+# ---------------- Text pre-clean helpers ----------------
+
+# Curly → straight quotes in one C-level translate pass
+_CURLY_TABLE = str.maketrans({'\u201c': '"', '\u201d': '"', '\u2018': "'", '\u2019': "'"})
+_WRAPPER_MARKERS = ('BEGIN JSON', 'END JSON', 'BEGIN MARKDOWN', 'END MARKDOWN')
+
+def preclean_markdown_links(text: str) -> str:
+    # [label](https://...) -> https://...
+    text = _MD_LINK_RE.sub(r'\2', text)
+    # [https://host/...] -> https://host/...
+    text = _MD_BRACKET_URL_RE.sub(r'\1', text)
+    # Fix accidental leading '[' in quoted URLs
+    text = _QUOTED_BRACKET_RE.sub(r'"https://', text)
+    # Remove lingering "](https://...)" glue
+    text = text.replace("](", "")
+    text = text.replace(")]", ")")
+    return text
+
+def normalize_ctgov_in_text(text: str) -> str:
+    return _CTG_TEXT_RE.sub(r'https://clinicaltrials.gov/study/\1', text)
+
+def http_to_https(text: str) -> str:
+    return _HTTP_QUOTED_RE.sub('"https://', text)
+
+def strip_trailing_commas(text: str) -> str:
+    # Last-resort: remove trailing commas before closing } or ]
+    # Safe enough for JSON; do not overuse.
+    return _TRAILING_COMMA_RE.sub(r'\1', text)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def extract_first_json_object(text: str) -> str:
+    """
+    Extract the first top-level JSON object {...}.
+    Fast path: the C decoder's raw_decode finds the end of a well-formed
+    object in one call. Only genuinely malformed candidates (trailing
+    commas, debris inside) fall back to the brace-aware Python scanner,
+    which ignores braces inside strings and escaped quotes.
+    Returns the substring if found, else ''.
+    """
+    s = text
+    start = s.find('{')
+    if start == -1:
+        return ''
+    try:
+        _, end = _JSON_DECODER.raw_decode(s, start)
+        return s[start:end]
+    except json.JSONDecodeError:
+        pass
+    # Walk UTF-8 bytes so each step compares small ints instead of
+    # allocating a one-char str; '{', '}', '"', '\\' can never appear
+    # inside a multibyte sequence, so byte offsets are safe.
+    b = s.encode('utf-8', 'surrogatepass')
+    mv = memoryview(b)
+    start = b.find(0x7b)
+    depth = 0
+    in_str = False
+    esc = False
+    for i in range(start, len(b)):
+        ch = mv[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == 0x5c:   # backslash
+                esc = True
+            elif ch == 0x22:   # quote
+                in_str = False
+        else:
+            if ch == 0x22:
+                in_str = True
+            elif ch == 0x7b:   # {
+                depth += 1
+            elif ch == 0x7d:   # }
+                depth -= 1
+                if depth == 0:
+                    return b[start:i+1].decode('utf-8', 'surrogatepass')
+    return ''  # not balanced
+
+def preclean_text(raw: str, aggressive: bool=False) -> str:
+    """
+    Mechanical hygiene BEFORE JSON parse.
+    One line-wise pass drops fences/markers; if aggressive=True, curly quotes
+    become straight quotes (single translate pass) and the first top-level
+    object is extracted by brace scan BEFORE the regex fixups, so those run
+    on the small candidate instead of the whole paste.
+    """
+    lines = []
+    for line in raw.lstrip('\ufeff').splitlines():
+        l = line.strip()
+        if l.startswith('```') or l.upper() in _WRAPPER_MARKERS:
+            continue
+        lines.append(line)
+    t = "\n".join(lines)
+
+    if aggressive:
+        t = t.translate(_CURLY_TABLE)
+        # If multiple objects or prose present, extract the first top-level object
+        candidate = extract_first_json_object(t)
+        if candidate:
+            t = candidate
+
+    t = preclean_markdown_links(t)
+    t = normalize_ctgov_in_text(t)
+    t = http_to_https(t)
+    if aggressive:
+        # Try removing trailing commas (only in aggressive mode)
+        t = strip_trailing_commas(t)
+
+    return t
+
+# ---------------- URL utilities ----------------
+
+def purify_url(u: str) -> str:
+    if not isinstance(u, str):
+        return u
+    if u.startswith('http://'):
+        u = 'https://' + u[len('http://'):]
+    if not u.startswith('https://'):
+        return u
+    # Fast path: most URLs carry no query/fragment — nothing to strip,
+    # no need to take the URL apart and rebuild it.
+    if '?' not in u and '#' not in u:
+        return u.rstrip(')]')
+    base = u.partition('#')[0]  # fragment is always dropped
+    path, sep, query = base.partition('?')
+    if sep:
+        kept = [t for t in query.split('&')
+                if t and not _TRACK_RE.match(t)]
+        base = path + '?' + '&'.join(kept) if kept else path
+    return base.rstrip(')]')
+
+def medrxiv_to_doi(url: str) -> str:
+    if not isinstance(url, str):
+        return url
+    m = PREPRINT_CONTENT_RE.search(url)
+    if not m:
+        return url
+    return f'https://doi.org/{m.group(1)}'
+
+def normalize_ctgov(url: str) -> str:
+    if not isinstance(url, str):
+        return url
+    m = CTG_SHOW_PAT.match(url)
+    if m:
+        return f'https://clinicaltrials.gov/study/{m.group(1)}'
+    return url
+
+# Markdown/bracket debris that means a contact URL needs token extraction
+_URL_DEBRIS_CHARS = frozenset('[]()')
+
+# The same author pages / registry links / DOIs repeat many times within one
+# document; memoize the pure string->string normalizers so repeats cost a
+# dict lookup.
+@lru_cache(maxsize=8192)
+def _purify_url_cached(u: str) -> str:
+    return purify_url(u)
+
+@lru_cache(maxsize=8192)
+def _normalize_ctgov_cached(u: str) -> str:
+    return normalize_ctgov(u)
+
+@lru_cache(maxsize=8192)
+def _medrxiv_to_doi_cached(u: str) -> str:
+    return medrxiv_to_doi(u)
+
+def _clean_url_batch(urls):
+    """
+    Normalize a batch of URL strings in one tight loop.
+    Single entry point for the hot URL path so a compiled implementation
+    could slot in behind it without touching clean_person.
+    """
+    out = []
+    append = out.append
+    for u in urls:
+        if isinstance(u, str):
+            u = _normalize_ctgov_cached(_purify_url_cached(u))
+        append(u)
+    return out
+
+def extract_all_urls(s: str):
+    return _URL_TOKEN_RE.findall(s or "")
+
+def word_count(s: str) -> int:
+    return len((s or "").strip().split())
+
+# ---------------- Structure-level cleanup ----------------
+
+def clean_person(person, errors, warnings, idx, fixes=None):
+    # fixes collects "we rewrote a value" notes; when it stays empty the
+    # caller knows the document came through untouched.
+    if fixes is None:
+        fixes = []
+    pid = person.get('id', f'?{idx}')
+    # Section
+    if person.get("section") not in ALLOWED_SECTIONS:
+        errors.append(f"person[{idx}]/{pid}: invalid section '{person.get('section')}'")
+
+    # Summary length
+    sw = word_count(person.get("summary_text",""))
+    if sw < 140 or sw > 220:
+        warnings.append(f"person[{idx}]/{pid}: summary_text words={sw} (expected 140–220)")
+
+    # Evidence
+    ev = person.get("evidence", [])
+    for j, e in enumerate(ev):
+        tag = e.get("tag")
+        if isinstance(tag, str):
+            tag = sys.intern(tag)
+        if tag not in ALLOWED_TAGS:
+            errors.append(f"person[{idx}]/{pid}/evidence[{j}]: invalid tag '{tag}'")
+
+        cu = e.get("canonical_url")
+        if isinstance(cu, str):
+            new_cu = _normalize_ctgov_cached(_purify_url_cached(cu))
+            if tag == "preprint":
+                new_cu = _medrxiv_to_doi_cached(new_cu)
+            if new_cu != cu:
+                e["canonical_url"] = new_cu
+                fixes.append(f"person[{idx}]/{pid}/evidence[{j}]: normalized canonical_url")
+
+        pdf = e.get("pdf_url")
+        if isinstance(pdf, str):
+            new_pdf = _purify_url_cached(pdf)
+            if new_pdf != pdf:
+                e["pdf_url"] = new_pdf
+                fixes.append(f"person[{idx}]/{pid}/evidence[{j}]: normalized pdf_url")
+
+        cu_ok = isinstance(e.get("canonical_url"), str) and URL_REGEX.match(e["canonical_url"])
+        if not cu_ok:
+            errors.append(f"person[{idx}]/{pid}/evidence[{j}]: invalid canonical_url '{e.get('canonical_url')}'")
+
+    # Contacts
+    contacts = person.get("contacts", [])
+    fixed_contacts = []
+    for j, c in enumerate(contacts):
+        ctype = c.get("type","page")
+        url = c.get("url","")
+        vdate = c.get("verified_date","")
+
+        # unwrap debris / pick first https
+        if isinstance(url, str):
+            has_debris = not _URL_DEBRIS_CHARS.isdisjoint(url)
+            if has_debris or (URL_REGEX.match(url) is None
+                              and not url.startswith(('mailto:', 'tel:'))):
+                urls = extract_all_urls(url)
+                if urls:
+                    url = urls[0]
+        if isinstance(url, str):
+            url = _purify_url_cached(url)
+            url = _normalize_ctgov_cached(url)
+
+        if ctype == "email":
+            if url.startswith("mailto:"):
+                email = url[len("mailto:"):]
+            else:
+                if EMAIL_REGEX.match(url):
+                    url = f"mailto:{url}"
+                    email = url[len("mailto:"):]
+                else:
+                    email = url
+            if not EMAIL_REGEX.match(email):
+                errors.append(f"person[{idx}]/{pid}/contacts[{j}]: invalid mailto")
+        elif ctype == "phone":
+            if not isinstance(url, str) or not url.startswith("tel:"):
+                errors.append(f"person[{idx}]/{pid}/contacts[{j}]: invalid phone URL (must start 'tel:')")
+        else:
+            if not isinstance(url, str) or not URL_REGEX.match(url):
+                errors.append(f"person[{idx}]/{pid}/contacts[{j}]: invalid URL '{url}' for page")
+
+        if not isinstance(vdate, str) or not DATE_REGEX.match(vdate):
+            warnings.append(f"person[{idx}]/{pid}/contacts[{j}]: missing or non-ISO verified_date")
+
+        if url != c.get("url"):
+            c["url"] = url
+            fixes.append(f"person[{idx}]/{pid}/contacts[{j}]: normalized url")
+        fixed_contacts.append(c)
+    person["contacts"] = fixed_contacts
+
+    # Key links
+    for j, k in enumerate(person.get("key_links", [])):
+        ku = k.get("url")
+        if isinstance(ku, str):
+            new_ku = _normalize_ctgov_cached(_purify_url_cached(ku))
+            if new_ku != ku:
+                k["url"] = new_ku
+                fixes.append(f"person[{idx}]/{pid}/key_links[{j}]: normalized url")
+            if not URL_REGEX.match(new_ku):
+                errors.append(f"person[{idx}]/{pid}/key_links[{j}]: invalid url '{new_ku}'")
+
+    # Trials
+    trials = person.get("trials", [])
+    for j, t in enumerate(trials):
+        su = t.get("source_urls")
+        urls = []
+        if isinstance(su, list):
+            urls = su
+        elif isinstance(su, str):
+            urls = extract_all_urls(su)
+        else:
+            errors.append(f"person[{idx}]/{pid}/trials[{j}]: source_urls must be an array or string with https URLs")
+
+        clean_urls = []
+        for u in _clean_url_batch(urls):
+            if URL_REGEX.match(u):
+                clean_urls.append(u)
+        if not clean_urls:
+            errors.append(f"person[{idx}]/{pid}/trials[{j}]: no valid https URLs in source_urls")
+        if clean_urls != su:
+            t["source_urls"] = clean_urls
+            fixes.append(f"person[{idx}]/{pid}/trials[{j}]: normalized source_urls")
+
+        nct = t.get("nct_id")
+        if isinstance(nct, str) and nct != nct.upper():
+            t["nct_id"] = nct.upper()
+            fixes.append(f"person[{idx}]/{pid}/trials[{j}]: uppercased nct_id")
+
+    return person
+
+# Pure form for the process pool: no shared error/warning lists to mutate,
+# just (person, idx) in and (person, errors, warnings) out.
+def clean_person_pure(args):
+    person, idx = args
+    errors, warnings, fixes = [], [], []
+    clean_person(person, errors, warnings, idx, fixes)
+    return person, errors, warnings, fixes
+
+# Below this many people, fork + pickle overhead beats the parallel win.
+_PARALLEL_THRESHOLD = 200
+
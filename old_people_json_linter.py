@@ -1,26 +1,23 @@
 #!/usr/bin/env python3
-import json, sys, re, os
+# Thin CLI over linter_core with this script's original (stricter)
+# report semantics: fixes are reported, contiguity is an error, etc.
+import json, sys, re
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from datetime import date
 
-ALLOWED_SECTIONS = {
-    "Care & Management", "Trials & Translational",
-    "Models & Assays", "Registries & Biobanks"
-}
-ALLOWED_TAGS = {
-    "peer_reviewed","preprint","trial_registry","case_series",
-    "review_consensus","dataset_protocol","news_talk",
-    "preclinical_rescue_in_vitro","preclinical_rescue_in_vivo","patent_grant"
-}
-URL_RE = re.compile(r"^https://[^\s\[\]\(\)]+$")
+from linter_core import (
+    ALLOWED_SECTIONS, ALLOWED_TAGS, json_loads, json_dumps_pretty,
+    word_count, URL_REGEX as URL_RE,
+)
+
 MAILTO_RE = re.compile(r"^mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})$")
 TEL_RE = re.compile(r"^tel:\+?[0-9\-\(\)\s]+$")
+MD_LINK_RE = re.compile(r"^\[[^\]]+\]\((https?://[^)]+)\)$")
+# This linter's own URL policy, distinct from core purify_url: tracking
+# params are matched by exact key (so e.g. ?refresh=1 survives) and
+# ordinary fragments are kept — only #:~:text= highlights are dropped.
 TRACK_KEYS = {"utm_source","utm_medium","utm_campaign","utm_term","utm_content","gclid","fbclid"}
 
-def unwrap_markdown(u: str) -> str:
-    m = re.match(r"^\[[^\]]+\]\((https?://[^)]+)\)$", u.strip())
-    return m.group(1) if m else u
-
 def strip_tracking(u: str) -> str:
     try:
         p = urlparse(u)
@@ -31,7 +28,12 @@ def strip_tracking(u: str) -> str:
     except Exception:
         return u
 
+def unwrap_markdown(u: str) -> str:
+    m = MD_LINK_RE.match(u.strip())
+    return m.group(1) if m else u
+
 def normalize_ctgov(u: str) -> str:
+    # looser than core's anchored variant: tolerates query/fragment tails
     if "clinicaltrials.gov" in u and "/ct2/show/" in u:
         nct = u.split("/ct2/show/")[-1].split("?")[0].split("#")[0]
         return f"https://clinicaltrials.gov/study/{nct}"
@@ -43,9 +45,6 @@ def clean_url(u: str) -> str:
     u = normalize_ctgov(u)
     return u
 
-def word_count(s: str) -> int:
-    return len(re.findall(r"\b\w+\b", s or ""))
-
 def fail(msg, errors): errors.append(msg)
 
 def lint(obj):
@@ -150,7 +149,7 @@ def main():
     with open(src, "r", encoding="utf-8") as f:
         raw = f.read().strip()
     try:
-        obj = json.loads(raw)
+        obj = json_loads(raw)
     except Exception as e:
         print(f"FATAL: not valid JSON: {e}", file=sys.stderr)
         sys.exit(1)
@@ -162,7 +161,7 @@ def main():
     print(json.dumps(report, indent=2))
     if status == "pass":
         with open(dst, "w", encoding="utf-8") as f:
-            json.dump(obj, f, ensure_ascii=False, indent=2)
+            f.write(json_dumps_pretty(obj))
         sys.exit(0)
     else:
         sys.exit(1)